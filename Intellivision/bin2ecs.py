@@ -41,12 +41,31 @@
 #          Paged blocks for page 15
 #          If JLP banking, an optional 1536 bytes of preserved flash data can be stored here (all or nothing)
 #          Note that only the used blocks are stored
+#
+# Pack file format (many ECS images in one file, written with --pack):
+#
+# [00..07] "ECSPACK0" hard-coded identifier and ASCII encoded version #
+# [08..0B] number of index entries, 32-bit big-endian
+# [0C..0F] offset of the index, 32-bit big-endian
+# [10..1FF] reserved for future use (must be 0)
+# [200..  ] ECS images, each starting on a 512-byte sector boundary and zero padded
+# [index  ] 128-byte entries sorted by title (ASCII case-insensitive), so a title can
+#          be found with a binary search:
+#          [00..03] offset of the ECS image, 32-bit big-endian
+#          [04..07] length of the ECS image, 32-bit big-endian
+#          [08..08] banking style of the ECS image (same as ECS header byte 8)
+#          [09..0B] reserved for future use (must be 0)
+#          [0C..7F] UTF-8 title, zero padded
+#          Appending writes new images and a fresh index after the old index, then
+#          updates the header, so images are never moved
 
 import os
+import io
 import sys
 import hashlib
 from pathlib import Path
 import argparse
+import bisect
 
 header = bytearray(0x10)
 header[0:7] = 0x45, 0x43, 0x53, 0x49, 0x4E, 0x54, 0x56 # ECSINTV
@@ -461,72 +480,49 @@ cart_data = [
 ]
 
 mappers = {
-    0: {
-        '5000':
-            { 'offset': 0x0000, 'words': 0x2000, 'loc': 0x5000, 'key': '5000'},
-        'd000':
-            {'offset': 0x2000, 'words': 0x1000, 'loc': 0xd000, 'key': 'd000'},
-        'f000':
-            {'offset': 0x3000, 'words': 0x1000, 'loc': 0xf000, 'key': 'f000'}
-    },
-    1: {
-        '5000':
-            { 'offset': 0x0000, 'words': 0x2000, 'loc': 0x5000, 'key': '5000'},
-        'd000':
-            {'offset': 0x2000, 'words': 0x3000, 'loc': 0xd000, 'key': 'd000'},
-    },
-    2: {
-        '5000':
-            { 'offset': 0x0000, 'words': 0x2000, 'loc': 0x5000, 'key': '5000'},
-        '9000':
-            {'offset': 0x2000, 'words': 0x3000, 'loc': 0x9000, 'key': '9000'},
-        'd000':
-            {'offset': 0x5000, 'words': 0x1000, 'loc': 0xd000, 'key': 'd000'}
-    },
-    3: {
-        '5000':
-            {'offset': 0x0000, 'words': 0x2000, 'loc': 0x5000, 'key': '5000'},
-        '9000':
-            {'offset': 0x2000, 'words': 0x2000, 'loc': 0x9000, 'key': '9000'},
-        'd000':
-            {'offset': 0x4000, 'words': 0x1000, 'loc': 0xd000, 'key': 'd000'},
-        'f000':
-            {'offset': 0x5000, 'words': 0x1000, 'loc': 0xf000, 'key': 'f000'}
-    },
-    4: {
-        '5000':
-            {'offset': 0x0000, 'words': 0x2000, 'loc': 0x5000, 'key': '5000'},
-        'd000':
-            {'loc': 0xd000, 'words': 0x0400, 'ram': 8, 'key': 'd000'}
-    },
-    5: {
-        '5000':
-            {'offset': 0x0000, 'words': 0x3000, 'loc': 0x5000, 'key': '5000'},
-        '9000':
-            {'offset': 0x3000, 'words': 0x3000, 'loc': 0x9000, 'key': '9000'}
-    },
-    6: {
-        '6000':
-            {'offset': 0x0000, 'words': 0x2000, 'loc': 0x6000, 'key': '6000'}
-    },
-    7: {
-        '4800':
-            {'offset': 0x0000, 'words': 0x2000, 'loc': 0x4800, 'key': '4800'}
-    },
-    8: {
-        '5000':
-            {'offset': 0x0000, 'words': 0x1000, 'loc': 0x5000, 'key': '5000'},
-        '7000':
-            {'offset': 0x1000, 'words': 0x1000, 'loc': 0x7000, 'key': '7000'}
-    },
-    9: {
-        '5000':
-            {'offset': 0x0000, 'words': 0x2000, 'loc': 0x5000, 'key': '5000'},
-        '9000':
-            {'offset': 0x2000, 'words': 0x2000, 'loc': 0x9000, 'key': '9000'},
-        'd000':
-            {'loc': 0xd000, 'words': 0x0400, 'ram': 8, 'key': 'd000'}
-    }
+    0: [
+        {'offset': 0x0000, 'words': 0x2000, 'loc': 0x5000},
+        {'offset': 0x2000, 'words': 0x1000, 'loc': 0xd000},
+        {'offset': 0x3000, 'words': 0x1000, 'loc': 0xf000}
+    ],
+    1: [
+        {'offset': 0x0000, 'words': 0x2000, 'loc': 0x5000},
+        {'offset': 0x2000, 'words': 0x3000, 'loc': 0xd000},
+    ],
+    2: [
+        {'offset': 0x0000, 'words': 0x2000, 'loc': 0x5000},
+        {'offset': 0x2000, 'words': 0x3000, 'loc': 0x9000},
+        {'offset': 0x5000, 'words': 0x1000, 'loc': 0xd000}
+    ],
+    3: [
+        {'offset': 0x0000, 'words': 0x2000, 'loc': 0x5000},
+        {'offset': 0x2000, 'words': 0x2000, 'loc': 0x9000},
+        {'offset': 0x4000, 'words': 0x1000, 'loc': 0xd000},
+        {'offset': 0x5000, 'words': 0x1000, 'loc': 0xf000}
+    ],
+    4: [
+        {'offset': 0x0000, 'words': 0x2000, 'loc': 0x5000},
+        {'loc': 0xd000, 'words': 0x0400, 'ram': 8}
+    ],
+    5: [
+        {'offset': 0x0000, 'words': 0x3000, 'loc': 0x5000},
+        {'offset': 0x3000, 'words': 0x3000, 'loc': 0x9000}
+    ],
+    6: [
+        {'offset': 0x0000, 'words': 0x2000, 'loc': 0x6000}
+    ],
+    7: [
+        {'offset': 0x0000, 'words': 0x2000, 'loc': 0x4800}
+    ],
+    8: [
+        {'offset': 0x0000, 'words': 0x1000, 'loc': 0x5000},
+        {'offset': 0x1000, 'words': 0x1000, 'loc': 0x7000}
+    ],
+    9: [
+        {'offset': 0x0000, 'words': 0x2000, 'loc': 0x5000},
+        {'offset': 0x2000, 'words': 0x2000, 'loc': 0x9000},
+        {'loc': 0xd000, 'words': 0x0400, 'ram': 8}
+    ]
 }
 
 # 32 x 2K banks = 64K address space
@@ -536,40 +532,98 @@ BLOCKSIZE = 0x800
 MAXADDR = 0x10000
 BYTESPERWORD = 2
 
-def convert(binfile, cfginfo, ecsfile):
-    pagedata = {}
+def findspan(spans, page, start, end):
+    # spans holds sorted, non-overlapping [start, end) ranges per page
+    starts, ends = spans.get(page, ([], []))
+    i = bisect.bisect_right(starts, start)
+    if i > 0 and ends[i - 1] > start:
+        return True
+    return i < len(starts) and starts[i] < end
+
+def addspan(spans, page, start, end):
+    if findspan(spans, page, start, end):
+        return False
+    starts, ends = spans.setdefault(page, ([], []))
+    i = bisect.bisect_right(starts, start)
+    starts.insert(i, start)
+    ends.insert(i, end)
+    return True
+
+def compilecfg(cfginfo):
+    spans = {}
+    ramspans = {}
+    rams = []
+    copies = {}
+    # RAM is claimed first so that preloads into it can be told apart from ROM conflicts
+    for info in sorted(cfginfo, key=lambda info: info.get("ram", -1) == -1):
+        loc = info["loc"]
+        words = info["words"]
+        page = info.get("page", -1)
+        desc = "$%04x-$%04x" % (loc, loc + words - 1) + (" page %x" % page if page != -1 else "")
+        if words <= 0 or loc < 0 or loc + words > MAXADDR or page >= MAXPAGE:
+            print("Error: Invalid location", desc + ", ignoring")
+            continue
+        if info.get("preload") and findspan(ramspans, page, loc, loc + words):
+            print("Warning: preload into RAM at", desc, "is not supported by .ecs, ignoring")
+            continue
+        if not addspan(spans, page, loc, loc + words):
+            if info.get("ram", -1) == -1 and findspan(ramspans, page, loc, loc + words):
+                print("Warning:", desc, "overlaps RAM, ignoring")
+            else:
+                print("Warning:", desc, "overlaps an earlier range, ignoring")
+            continue
+        if info.get("ram", -1) != -1:
+            addspan(ramspans, page, loc, loc + words)
+            rams.append(info)
+        else:
+            copies.setdefault(page, []).append({"offset": info["offset"], "words": words, "loc": loc, "page": page})
+
+    # merge ranges that are contiguous in both the .bin and the address space
+    ops = []
+    for page in sorted(copies):
+        run = None
+        for info in sorted(copies[page], key=lambda info: info["loc"]):
+            if run and run["loc"] + run["words"] == info["loc"] and run["offset"] + run["words"] == info["offset"]:
+                run["words"] += info["words"]
+            else:
+                run = info
+                ops.append(run)
+    ops.sort(key=lambda op: op["offset"])
+
     blocktype = bytearray(MAXBANK)
     blockdetails = bytearray(MAXBANK*2) # word array
-    for key in sorted(cfginfo):
-        info = cfginfo[key]
-        loc = info["loc"]
-        if loc < 0 or loc >= MAXADDR:
-            print("Error: Invalid location")
-        startblock = loc // BLOCKSIZE
-        endblock = (loc + info["words"] - 1) // BLOCKSIZE
-        
+    # in a block shared by several ranges, the one at the highest address sets the type
+    for info in sorted(rams + ops, key=lambda info: (info["loc"], info.get("page", -1))):
         usetype = ord('S') # static page
-        usepage = -1
         useparam = 0
         if info.get("ram", -1) != -1:
             usetype = ord('R') # ram page
             useparam = info["ram"]
-        else:
-            bytes = info["words"] * BYTESPERWORD
-            binfile.seek(info["offset"]*BYTESPERWORD)
-            if info.get("page", -1) != -1:
-                usetype = ord('P') # bankswitched page
-                usepage = info["page"]
-                useparam = 1 << usepage
-            if pagedata.get(usepage, -1) == -1:
-                pagedata[usepage] = bytearray(b'\xff') * (MAXADDR * BYTESPERWORD)
-            pagedata[usepage][loc*BYTESPERWORD:loc*BYTESPERWORD+bytes] = binfile.read(bytes)
-
-        for block in range(startblock, endblock + 1):
+        elif info["page"] != -1:
+            usetype = ord('P') # bankswitched page
+            useparam = 1 << info["page"]
+
+        for block in range(info["loc"] // BLOCKSIZE, (info["loc"] + info["words"] - 1) // BLOCKSIZE + 1):
+            if blocktype[block] not in (0, usetype):
+                print("Warning: block $%04x mixes '%c' and '%c' data" % (block * BLOCKSIZE, blocktype[block], usetype))
             blocktype[block] = usetype
             blockdetails[block * 2 + 0] |= useparam >> 8
             blockdetails[block * 2 + 1] |= useparam & 0xff
 
+    return {"copies": ops, "blocktype": blocktype, "blockdetails": blockdetails}
+
+def convert(binfile, layout, ecsfile):
+    pagedata = {}
+    blocktype = layout["blocktype"]
+    blockdetails = layout["blockdetails"]
+    for op in layout["copies"]:
+        page = op["page"]
+        if page not in pagedata:
+            pagedata[page] = bytearray(b'\xff') * (MAXADDR * BYTESPERWORD)
+        binfile.seek(op["offset"]*BYTESPERWORD)
+        data = binfile.read(op["words"]*BYTESPERWORD)
+        pagedata[page][op["loc"]*BYTESPERWORD:op["loc"]*BYTESPERWORD+len(data)] = data
+
     ecsfile.write(header)
     ecsfile.write(blocktype)
     ecsfile.write(blockdetails)
@@ -584,7 +638,127 @@ def convert(binfile, cfginfo, ecsfile):
                 if (blockdetails[block * 2 + (1 if page < 8 else 0)] >> (page & 7)) & 1:
                     ecsfile.write(pagedata[page][block * BLOCKSIZE*BYTESPERWORD:(block+1) * BLOCKSIZE*BYTESPERWORD])
 
-    ecsfile.close()
+PACKID = b'ECSPACK0'
+SECTORSIZE = 0x200
+PACKMAXSIZE = 0x100000000 # offsets are 32-bit
+PACKENTRYSIZE = 0x80
+PACKTITLESIZE = PACKENTRYSIZE - 0x0C
+WINDOWSRESERVED = ['CON', 'PRN', 'AUX', 'NUL'] + ['COM%d' % i for i in range(1, 10)] + ['LPT%d' % i for i in range(1, 10)]
+
+def packtitle(title):
+    # truncate on a character boundary so the stored title decodes back unchanged; file stems
+    # that were not valid UTF-8 carry surrogates, which are stored as '?'
+    return title.encode('utf-8', 'replace')[:PACKTITLESIZE].decode('utf-8', 'ignore').encode('utf-8')
+
+def packkey(title):
+    return packtitle(title).lower()
+
+def packentry(record):
+    return {"offset": int.from_bytes(record[0:4], 'big'),
+            "length": int.from_bytes(record[4:8], 'big'),
+            "banking": record[8],
+            "title": record[12:].rstrip(b'\0').decode('utf-8', 'replace')}
+
+def packheader(packfile):
+    packfile.seek(0)
+    head = packfile.read(0x10)
+    if len(head) < 0x10 or head[0:8] != PACKID:
+        return None
+    return int.from_bytes(head[8:12], 'big'), int.from_bytes(head[12:16], 'big')
+
+def packopen(packname):
+    if not os.path.exists(packname):
+        packfile = open(packname, 'w+b')
+        packfile.write(bytearray(SECTORSIZE))
+        return {"name": packname, "file": packfile, "entries": {}, "end": SECTORSIZE, "changed": True}
+    packfile = open(packname, 'r+b')
+    head = packheader(packfile)
+    if head is None:
+        packfile.close()
+        return None
+    count, indexoffset = head
+    packfile.seek(indexoffset)
+    index = packfile.read(count * PACKENTRYSIZE)
+    entries = {}
+    for i in range(0, len(index), PACKENTRYSIZE):
+        entry = packentry(index[i:i+PACKENTRYSIZE])
+        entries[packkey(entry["title"])] = entry
+    # new images go after the old index, so the pack stays valid until packclose()
+    end = -(-(indexoffset + len(index)) // SECTORSIZE) * SECTORSIZE
+    return {"name": packname, "file": packfile, "entries": entries, "end": end, "changed": False}
+
+def packfind(packfile, title):
+    head = packheader(packfile)
+    if head is None:
+        return None
+    count, indexoffset = head
+    key = packkey(title)
+    lo = 0
+    hi = count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        packfile.seek(indexoffset + mid * PACKENTRYSIZE)
+        if packkey(packentry(packfile.read(PACKENTRYSIZE))["title"]) < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    if lo < count:
+        packfile.seek(indexoffset + lo * PACKENTRYSIZE)
+        entry = packentry(packfile.read(PACKENTRYSIZE))
+        if packkey(entry["title"]) == key:
+            return entry
+
+def packfilename(title):
+    # titles can come from a cfg, so replace anything Windows will not accept in a file name
+    name = ''.join('_' if c in '<>:"/\\|?*' or ord(c) < 0x20 else c for c in title).rstrip('. ')
+    if name.split('.')[0].upper() in WINDOWSRESERVED:
+        name = '_' + name
+    return (name or '_') + '.ecs'
+
+def packread(packfile, entry):
+    packfile.seek(entry["offset"])
+    return packfile.read(entry["length"])
+
+def packadd(pack, title, data, force):
+    key = packkey(title)
+    if key in pack["entries"] and not force:
+        print(sys.argv[0] + ':', title, 'exists in', pack["name"] + ', not overwriting')
+        return False
+    size = len(data) + (-len(data) % SECTORSIZE)
+    count = len(pack["entries"]) + (0 if key in pack["entries"] else 1)
+    if pack["end"] + size + count * PACKENTRYSIZE > PACKMAXSIZE:
+        print(sys.argv[0] + ':', pack["name"], 'is full, not adding', title)
+        return False
+    packfile = pack["file"]
+    packfile.seek(pack["end"])
+    packfile.write(data)
+    packfile.write(bytearray(size - len(data)))
+    pack["entries"][key] = {"offset": pack["end"], "length": len(data), "banking": data[8], "title": title}
+    pack["end"] += size
+    pack["changed"] = True
+    return True
+
+def packclose(pack):
+    packfile = pack["file"]
+    if not pack["changed"]:
+        packfile.close()
+        return
+    entries = [pack["entries"][key] for key in sorted(pack["entries"])]
+    packfile.seek(pack["end"])
+    for entry in entries:
+        record = bytearray(PACKENTRYSIZE)
+        record[0:4] = entry["offset"].to_bytes(4, 'big')
+        record[4:8] = entry["length"].to_bytes(4, 'big')
+        record[8] = entry["banking"]
+        title = packtitle(entry["title"])
+        record[12:12+len(title)] = title
+        packfile.write(record)
+    packfile.truncate()
+    packfile.seek(0)
+    packfile.write(PACKID)
+    packfile.write(len(entries).to_bytes(4, 'big'))
+    packfile.write(pack["end"].to_bytes(4, 'big'))
+    packfile.close()
 
 def parsehex(hex):
     if hex[0] == '$':
@@ -599,9 +773,6 @@ def parsemap(mapinfo):
         val["loc"] = parsehex(mapinfo[4])
         if len(mapinfo) > 5 and mapinfo[5].lower() == "page":
             val["page"] = parsehex(mapinfo[6])
-            val["key"] = "%4xP%x" % (val["loc"], val["page"])
-        else:
-            val["key"] = "%4x" % (val["loc"])
         return val
 
 def parsemem(meminfo):
@@ -609,27 +780,39 @@ def parsemem(meminfo):
         val = {"loc": parsehex(meminfo[0])}
         val["words"] = parsehex(meminfo[2]) + 1 - val["loc"]
         val["ram"] = int(meminfo[5])
-        val["key"] = "%4x" % (val["loc"])
         return val
 
+def parsevar(varinfo):
+    name, sep, value = varinfo.partition('=')
+    if sep and len(name.strip()):
+        return name.strip().lower(), value.strip().strip('"')
+
 def parsecfg(cfgname):
     section = ""
-    items = {}
-    for txt in open(cfgname, 'r').readlines():
-        txt = txt.strip().lower()
+    items = []
+    cfgvars = {}
+    for raw in open(cfgname, 'r').readlines():
+        raw = raw.strip()
+        txt = raw.lower()
         if len(txt):
             if txt[0] == '[' and txt[-1] == ']':
                 section = txt[1:-1]
-            elif section == "mapping":
+            elif section == "mapping" or section == "preload":
                 data = parsemap(txt.split())
                 if data:
-                    items[data["key"]] = data
+                    if section == "preload":
+                        data["preload"] = True
+                    items.append(data)
             elif section == "memattr":
                 data = parsemem(txt.split())
                 if data:
-                    items[data["key"]] = data
-    print(sys.argv[0] + ': using custom mapper', items)
-    return items
+                    items.append(data)
+            elif section == "vars":
+                data = parsevar(raw)
+                if data:
+                    cfgvars[data[0]] = data[1]
+    print(sys.argv[0] + ': using custom mapper', items, cfgvars)
+    return items, cfgvars
 
 def sha512hash(filename):
     buffer_size = 0x10000
@@ -649,36 +832,70 @@ def main():
     parser.add_argument('-c', '--cc3', action='store_true', dest='cc3', help='Use CC3 banking rather than ECS', default=False)
     parser.add_argument('-j', '--jlp', action='store_true', dest='jlp', help='Use JLP features', default=False)
     parser.add_argument('-f', '--force', action='store_true', dest='force', help='Force overwriting existing files', default=False)
-    parser.add_argument('binfiles', nargs='+', type=str, help='.bin files to convert')
+    parser.add_argument('-p', '--pack', nargs=1, type=str, dest='pack', help='Add converted files to a pack file instead of writing .ecs files', default='')
+    parser.add_argument('-x', '--extract', action='append', type=str, dest='extract', help='Extract the titled .ecs file from the pack file (can be repeated)', default=[])
+    parser.add_argument('binfiles', nargs='*', type=str, help='.bin files to convert')
     args = parser.parse_args()
 
+    if len(args.binfiles) == 0 and len(args.extract) == 0:
+        parser.error('no .bin files to convert')
+    if len(args.extract) > 0 and len(args.pack) == 0:
+        parser.error('--extract requires --pack')
+
+    banking = 0x00
     if args.cc3 is True:
-        header[8] = 0x01
+        banking = 0x01
     if args.jlp is True:
-        header[8] = 0x02
+        banking = 0x02
 
-    for name in args.binfiles:
+    binfiles = args.binfiles
+    extract = args.extract
+    pack = None
+    if len(args.pack) > 0 and len(binfiles) > 0:
+        pack = packopen(args.pack[0])
+        if pack is None:
+            print(sys.argv[0] + ':', args.pack[0], 'is not a pack file, aborting')
+            binfiles = []
+            extract = []
+
+    for name in binfiles:
         if name.lower().endswith(".bin"):
             cfgname = str(Path(name).with_suffix('.cfg'))
+            cfgvars = {}
+            title = Path(name).stem
             if (os.path.exists(cfgname)):
                 print(sys.argv[0] + ':', cfgname, 'exists, overriding LUT')
                 cfgname = str(Path(name).with_suffix('.cfg'))
-                cfginfo = parsecfg(cfgname)
+                cfginfo, cfgvars = parsecfg(cfgname)
+                title = cfgvars.get('name') or title
             else:
                 hash = sha512hash(name)
                 for cartridge in cart_data:
                     if hash.lower() == cartridge['hash'].lower():
                         print(sys.argv[0] + ': matched', cartridge['name'])
                         cfginfo = mappers[cartridge['mapper']]
+                        title = cartridge['name']
                         break
                 else:
                     print(sys.argv[0] + ': unknown hash and no cfg, aborting')
                     continue
+            header[8] = banking
+            if banking == 0x00 and cfgvars.get('jlp', '0') not in ('0', ''):
+                header[8] = 0x02
+            if pack:
+                image = io.BytesIO()
+                with open(name, 'rb') as binfile:
+                    convert(binfile, compilecfg(cfginfo), image)
+                if not packadd(pack, title, image.getvalue(), args.force):
+                    continue
+                print(sys.argv[0] + ': added', title, 'to', args.pack[0])
+                continue
             ecsname = Path(name).with_suffix('.ecs')
             if len(args.dir) > 0:
                 ecsname = os.path.join(args.dir[0], os.path.basename(ecsname))
             if not os.path.exists(ecsname) or args.force is True:
-                convert(open(name, 'rb'), cfginfo, open(ecsname, 'wb'))
+                with open(name, 'rb') as binfile, open(ecsname, 'wb') as ecsfile:
+                    convert(binfile, compilecfg(cfginfo), ecsfile)
             else:
                 print(sys.argv[0] + ':', ecsname, 'exists, not overwriting')
                 continue
@@ -686,6 +903,36 @@ def main():
         else:
             print(sys.argv[0] + ':', name, 'does not end with .bin and will not be processed')
 
+    if pack:
+        packclose(pack)
+
+    if len(extract) > 0:
+        packfile = None
+        if not os.path.exists(args.pack[0]):
+            print(sys.argv[0] + ':', args.pack[0], 'does not exist, nothing to extract')
+        else:
+            packfile = open(args.pack[0], 'rb')
+            if packheader(packfile) is None:
+                print(sys.argv[0] + ':', args.pack[0], 'is not a pack file, aborting')
+                packfile.close()
+                packfile = None
+        for title in (extract if packfile else []):
+            entry = packfind(packfile, title)
+            if entry is None:
+                print(sys.argv[0] + ':', title, 'not found in', args.pack[0])
+                continue
+            ecsname = packfilename(entry["title"])
+            if len(args.dir) > 0:
+                ecsname = os.path.join(args.dir[0], ecsname)
+            if os.path.exists(ecsname) and args.force is not True:
+                print(sys.argv[0] + ':', ecsname, 'exists, not overwriting')
+                continue
+            with open(ecsname, 'wb') as ecsfile:
+                ecsfile.write(packread(packfile, entry))
+            print(sys.argv[0] + ': extracted', entry["title"], 'to', ecsname)
+        if packfile:
+            packfile.close()
+
     if getattr(sys, 'frozen', False):
         input("Press enter to proceed...")
 